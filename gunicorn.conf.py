@@ -0,0 +1,12 @@
+import os
+
+# GUNICORN_PRELOAD=1: o master carrega o app (e o snapshot) uma vez e os workers herdam os dados já parseados
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from wsgi import app
+    from sales_grid.services.github_store import revalidate_async
+    revalidate_async(app)
@@ -1,6 +1,9 @@
 from flask import Flask
 from .config import Config
-from .services.github_store import load_data
+from .services.github_store import init_app as init_store
+from .services.tenants import init_app as init_tenants
+from .services.assets import init_app as init_assets
+from .services.compression import init_app as init_compression
 
 def create_app():
     app = Flask(__name__, template_folder="templates", static_folder="static")
@@ -18,6 +21,13 @@ def create_app():
     app.register_blueprint(admin_bp)
     app.register_blueprint(api_bp)
 
-    return app  # ← sem load_data() aqui
+    init_assets(app)
+    init_compression(app)
+
+    # Sem load_data() bloqueante aqui: carrega o snapshot local e revalida em background
+    init_store(app)
+    init_tenants(app)
+
+    return app
 
 
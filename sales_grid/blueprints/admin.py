@@ -1,7 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from werkzeug.security import generate_password_hash
-from ..services.github_store import load_data, save_data
+from ..services.github_store import load_data, save_data, edit_locked
 from ..services.auth import login_required, role_required
+from ..services.catalog import ensure_sales_cells, ensure_item_cells, move_seller_sales
+from ..services.search import index_upsert, index_remove, invalidate_index
 
 bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -15,6 +17,7 @@ def settings():
 @bp.post("/settings")
 @login_required
 @role_required("ADMIN")
+@edit_locked
 def settings_post():
     data = load_data()
     company = data.setdefault("company", {})
@@ -35,6 +38,7 @@ def teams():
 @bp.post("/teams")
 @login_required
 @role_required("ADMIN")
+@edit_locked
 def teams_post():
     data = load_data()
     action = request.form.get("action")
@@ -52,6 +56,7 @@ def teams_post():
             "manager_photo_url": request.form.get("manager_photo_url", "").strip(),
         })
         save_data(data, f"Create team {new_id}")
+        index_upsert("team", teams[-1])
         flash("Equipe criada.", "success")
 
     elif action == "delete":
@@ -63,6 +68,7 @@ def teams_post():
             if tid in per:
                 per.pop(tid, None)
         save_data(data, f"Delete team {tid}")
+        invalidate_index()  # a equipe leva junto os vendedores
         flash("Equipe removida.", "info")
 
     elif action == "update":
@@ -75,6 +81,7 @@ def teams_post():
         t["manager_name"] = request.form.get("manager_name", "").strip()
         t["manager_photo_url"] = request.form.get("manager_photo_url", "").strip()
         save_data(data, f"Update team {tid}")
+        index_upsert("team", t)
         flash("Equipe atualizada.", "success")
 
     return redirect(url_for("admin.teams"))
@@ -90,6 +97,7 @@ def sellers():
 @bp.post("/sellers")
 @login_required
 @role_required("ADMIN")
+@edit_locked
 def sellers_post():
     data = load_data()
     action = request.form.get("action")
@@ -107,8 +115,9 @@ def sellers_post():
             "team_id": team_id,
             "photo_url": request.form.get("photo_url", "").strip(),
         })
-        _ensure_sales_cells(data, team_id, new_id)
+        ensure_sales_cells(data, team_id, new_id)
         save_data(data, f"Create seller {new_id}")
+        index_upsert("seller", sellers[-1])
         flash("Vendedor criado.", "success")
 
     elif action == "update":
@@ -122,8 +131,9 @@ def sellers_post():
         s["team_id"] = request.form.get("team_id")
         s["photo_url"] = request.form.get("photo_url", "").strip()
         if old_team != s["team_id"]:
-            _move_seller_sales(data, sid, old_team, s["team_id"])
+            move_seller_sales(data, sid, old_team, s["team_id"])
         save_data(data, f"Update seller {sid}")
+        index_upsert("seller", s)
         flash("Vendedor atualizado.", "success")
 
     elif action == "delete":
@@ -133,6 +143,7 @@ def sellers_post():
             for tid, team_sales in per.items():
                 team_sales.pop(sid, None)
         save_data(data, f"Delete seller {sid}")
+        index_remove("seller", sid)
         flash("Vendedor removido.", "info")
 
     return redirect(url_for("admin.sellers"))
@@ -147,6 +158,7 @@ def items():
 @bp.post("/items")
 @login_required
 @role_required("ADMIN")
+@edit_locked
 def items_post():
     data = load_data()
     action = request.form.get("action")
@@ -164,8 +176,9 @@ def items_post():
             "video_url": request.form.get("video_url", "").strip(),
             "target": int(request.form.get("target") or 18),
         })
-        _ensure_item_cells(data, new_id)
+        ensure_item_cells(data, new_id)
         save_data(data, f"Create item {new_id}")
+        index_upsert("item", items[-1])
         flash("Item criado.", "success")
 
     elif action == "update":
@@ -179,6 +192,7 @@ def items_post():
         it["video_url"] = request.form.get("video_url", "").strip()
         it["target"] = int(request.form.get("target") or it.get("target") or 18)
         save_data(data, f"Update item {iid}")
+        index_upsert("item", it)
         flash("Item atualizado.", "success")
 
     elif action == "delete":
@@ -189,6 +203,7 @@ def items_post():
                 for sid, row in team_sales.items():
                     row.pop(iid, None)
         save_data(data, f"Delete item {iid}")
+        index_remove("item", iid)
         flash("Item removido.", "info")
 
     return redirect(url_for("admin.items"))
@@ -200,31 +215,3 @@ def audit():
     data = load_data()
     audit = list(reversed(data.get("audit", [])))[:100]
     return render_template("admin/audit.html", audit=audit)
-
-def _ensure_sales_cells(data, team_id: str, seller_id: str):
-    # For each period, ensure this seller exists with all items (only if team_id exists)
-    items = data.get("items", [])
-    sales = data.setdefault("sales", {})
-    for pid, per in sales.items():
-        per.setdefault(team_id, {})
-        per[team_id].setdefault(seller_id, {it["id"]: 0 for it in items})
-        # also ensure any missing item keys
-        for it in items:
-            per[team_id][seller_id].setdefault(it["id"], 0)
-
-def _ensure_item_cells(data, item_id: str):
-    sales = data.setdefault("sales", {})
-    for pid, per in sales.items():
-        for tid, team_sales in per.items():
-            for sid, row in team_sales.items():
-                row.setdefault(item_id, 0)
-
-def _move_seller_sales(data, seller_id: str, old_team: str, new_team: str):
-    sales = data.setdefault("sales", {})
-    for pid, per in sales.items():
-        old = per.get(old_team, {})
-        row = old.pop(seller_id, None)
-        if row is None:
-            continue
-        per.setdefault(new_team, {})
-        per[new_team][seller_id] = row
@@ -1,9 +1,14 @@
 import csv
 import io
+import time
 from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify, Response, abort, session
-from ..services.github_store import load_data, save_data
-from ..services.auth import login_required, can_access_team, role_required
+from ..services.github_store import load_data, save_data, store_lock, store_status
+from ..services.auth import login_required, can_access_team, role_required, current_user
+from ..services.search import get_index, KINDS
+from ..services.compression import compression_report
+from ..services.catalog import apply_batch, CatalogError
+from ..services.matrix import MAX_CELL_VALUE
 
 bp = Blueprint("api", __name__, url_prefix="/api")
 
@@ -54,39 +59,40 @@ def cell_patch():
         return jsonify({"error": "value must be int"}), 400
     if value_int < 0:
         value_int = 0
+    if value_int > MAX_CELL_VALUE:
+        return jsonify({"error": f"value must be <= {MAX_CELL_VALUE}"}), 400
 
-    data = load_data()
-    sales = data.setdefault("sales", {})
-    sales.setdefault(period_id, {})
-    sales[period_id].setdefault(team_id, {})
-    sales[period_id][team_id].setdefault(seller_id, {})
-    sales[period_id][team_id][seller_id].setdefault(item_id, 0)
-
-    old = sales[period_id][team_id][seller_id].get(item_id, 0)
-    sales[period_id][team_id][seller_id][item_id] = value_int
-
-    entry = {
-        "at": _utcnow_iso(),
-        "by": (session.get("user") or {}).get("email"),
-        "type": "CELL_UPDATE",
-        "team_id": team_id,
-        "period_id": period_id,
-        "seller_id": seller_id,
-        "item_id": item_id,
-        "from": old,
-        "to": value_int,
-    }
-    audit = data.setdefault("audit", [])
-    audit.append(entry)
-    if len(audit) > 500:
-        data["audit"] = audit[-500:]
+    # load dentro do lock: um batch do admin pode ter trocado o documento em cache
+    with store_lock():
+        data = load_data()
+        sales = data.setdefault("sales", {})
+        sales.setdefault(period_id, {})
+        sales[period_id].setdefault(team_id, {})
+        sales[period_id][team_id].setdefault(seller_id, {})
+        sales[period_id][team_id][seller_id].setdefault(item_id, 0)
 
-    try:
-        save_data(data, f"Update cell {team_id}/{period_id} {seller_id}:{item_id} -> {value_int}")
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        old = sales[period_id][team_id][seller_id].get(item_id, 0)
+        sales[period_id][team_id][seller_id][item_id] = value_int
+
+        entry = {
+            "at": _utcnow_iso(),
+            "by": (session.get("user") or {}).get("email"),
+            "type": "CELL_UPDATE",
+            "team_id": team_id,
+            "period_id": period_id,
+            "seller_id": seller_id,
+            "item_id": item_id,
+            "from": old,
+            "to": value_int,
+        }
+        _append_audit(data, [entry])
 
-    return jsonify({"ok": True, "value": value_int, "updated_at": data.get("meta", {}).get("updated_at")})
+        try:
+            save_data(data, f"Update cell {team_id}/{period_id} {seller_id}:{item_id} -> {value_int}")
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+        return jsonify({"ok": True, "value": value_int, "updated_at": data.get("meta", {}).get("updated_at")})
 
 @bp.get("/export.csv")
 @login_required
@@ -121,6 +127,249 @@ def export_csv():
     resp.headers["Content-Disposition"] = f"attachment; filename={filename}"
     return resp
 
+@bp.post("/import")
+@login_required
+def import_sales():
+    """Bulk import of a team/period grid (CSV like export.csv, or JSON) in a single commit.
+
+    Every seller and item is validated up front; nothing is written unless the
+    whole payload is valid. ``dry_run=1`` returns the diff without saving.
+    """
+    payload = request.get_json(silent=True) if request.is_json else None
+    if request.is_json and not isinstance(payload, dict):
+        return jsonify({"error": "invalid JSON body"}), 400
+    params = payload if payload is not None else request.values
+    team_id = params.get("team_id") or request.args.get("team_id")
+    period_id = params.get("period_id") or request.args.get("period_id")
+    dry_run = str(params.get("dry_run") or request.args.get("dry_run") or "").lower() in ("1", "true", "yes")
+
+    if not team_id or not period_id:
+        return jsonify({"error": "team_id and period_id required"}), 400
+    if not can_access_team(team_id):
+        abort(403)
+
+    with store_lock():
+        data = load_data()
+        if not any(t.get("id") == team_id for t in data.get("teams", [])):
+            return jsonify({"error": "unknown team_id"}), 400
+        if not any(p.get("id") == period_id for p in data.get("periods", [])):
+            return jsonify({"error": "unknown period_id"}), 400
+
+        seller_ids = {s["id"] for s in data.get("sellers", []) if s.get("team_id") == team_id}
+        items = data.get("items", [])
+        item_ids = {it["id"] for it in items}
+
+        if payload is not None:
+            cells, errors = _cells_from_json(payload, seller_ids, item_ids)
+        else:
+            upload = request.files.get("file")
+            raw = upload.read() if upload else request.get_data()
+            cells, errors = _cells_from_csv(raw, seller_ids, items)
+
+        if errors:
+            return jsonify({"error": "invalid import", "errors": errors[:100], "error_count": len(errors)}), 400
+
+        team_sales = data.get("sales", {}).get(period_id, {}).get(team_id, {})
+        diff = []
+        for (seller_id, item_id), value in cells.items():
+            old = int((team_sales.get(seller_id) or {}).get(item_id, 0) or 0)
+            if old != value:
+                diff.append({"seller_id": seller_id, "item_id": item_id, "from": old, "to": value})
+
+        result = {"ok": True, "dry_run": dry_run, "cells": len(cells), "changed": len(diff), "diff": diff}
+        if dry_run or not diff:
+            return jsonify(result)
+
+        # snapshot do que vai ser tocado, para o rollback devolver o documento exatamente como estava
+        had_sales = "sales" in data
+        sales = data.setdefault("sales", {})
+        had_period = period_id in sales
+        had_team = had_period and team_id in sales[period_id]
+        team_sales = sales.setdefault(period_id, {}).setdefault(team_id, {})
+        touched = {d["seller_id"] for d in diff}
+        prev_rows = {sid: (dict(team_sales[sid]) if sid in team_sales else None) for sid in touched}
+        prev_audit = list(data.get("audit", []))
+
+        for d in diff:
+            team_sales.setdefault(d["seller_id"], {})[d["item_id"]] = d["to"]
+        # Uma única entrada resumida: um import grande não pode empurrar o histórico para fora do limite de 500
+        _append_audit(data, [{
+            "at": _utcnow_iso(),
+            "by": (session.get("user") or {}).get("email"),
+            "type": "IMPORT",
+            "team_id": team_id,
+            "period_id": period_id,
+            "cells": len(cells),
+            "changed": len(diff),
+            "sellers": len(touched),
+            # só uma amostra: o diff completo vai na resposta, não no documento commitado
+            "sample": diff[:AUDIT_IMPORT_SAMPLE],
+        }])
+
+        try:
+            save_data(data, f"Import {len(diff)} cells {team_id}/{period_id}")
+        except Exception as e:
+            # desfaz tudo: o cache em memória volta ao estado anterior ao import
+            if not had_sales:
+                data.pop("sales", None)
+            elif not had_period:
+                sales.pop(period_id, None)
+            elif not had_team:
+                sales[period_id].pop(team_id, None)
+            else:
+                for sid, row in prev_rows.items():
+                    if row is None:
+                        team_sales.pop(sid, None)
+                    else:
+                        team_sales[sid] = row
+            data["audit"] = prev_audit
+            return jsonify({"error": str(e)}), 500
+
+        result["updated_at"] = data.get("meta", {}).get("updated_at")
+        return jsonify(result)
+
+AUDIT_IMPORT_SAMPLE = 20
+
+def _append_audit(data, entries):
+    audit = data.setdefault("audit", [])
+    audit.extend(entries)
+    if len(audit) > 500:
+        data["audit"] = audit[-500:]
+
+def _parse_qty(value):
+    value_int = int(str(value).strip())
+    if value_int > MAX_CELL_VALUE:
+        raise ValueError(value)
+    return value_int if value_int > 0 else 0
+
+def _cells_from_json(payload, seller_ids, item_ids):
+    # Accepts {"sales": {seller_id: {item_id: value}}} (same shape as /api/grid)
+    # or {"cells": [{"seller_id", "item_id", "value"}]}
+    sales = payload.get("sales") or {}
+    cells_in = payload.get("cells") or []
+    if not isinstance(sales, dict):
+        return {}, [{"error": "sales must be an object {seller_id: {item_id: value}}"}]
+    if not isinstance(cells_in, list):
+        return {}, [{"error": "cells must be a list of {seller_id, item_id, value}"}]
+
+    rows = []
+    for sid, row in sales.items():
+        if not isinstance(row, dict):
+            rows.append((sid, None, row))
+            continue
+        for iid, value in row.items():
+            rows.append((sid, iid, value))
+    for c in cells_in:
+        c = c if isinstance(c, dict) else {}
+        rows.append((c.get("seller_id"), c.get("item_id"), c.get("value")))
+
+    cells, errors = {}, []
+    for sid, iid, value in rows:
+        if not isinstance(sid, str) or (iid is not None and not isinstance(iid, str)):
+            errors.append({"seller_id": sid, "item_id": iid, "error": "seller_id and item_id must be strings"})
+            continue
+        if sid not in seller_ids:
+            errors.append({"seller_id": sid, "error": "unknown seller for team"})
+            continue
+        if iid not in item_ids:
+            errors.append({"seller_id": sid, "item_id": iid, "error": "unknown item"})
+            continue
+        try:
+            cells[(sid, iid)] = _parse_qty(value)
+        except (TypeError, ValueError):
+            errors.append({"seller_id": sid, "item_id": iid, "error": "value must be int"})
+    return cells, errors
+
+def _cells_from_csv(raw: bytes, seller_ids, items):
+    # Same layout as export.csv: seller_id, seller_name, <item columns...>, total
+    try:
+        text = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return {}, [{"error": "CSV must be UTF-8"}]
+    try:
+        dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+    header = next(reader, None)
+    if not header or header[0].strip() != "seller_id":
+        return {}, [{"error": "CSV header must start with seller_id"}]
+
+    by_id = {it["id"]: it["id"] for it in items}
+    by_name = {}
+    for it in items:
+        by_name.setdefault(it.get("name", ""), []).append(it["id"])
+
+    errors = []
+    columns = []  # (csv column index, item_id)
+    for idx, name in enumerate(header[2:], start=2):
+        name = name.strip()
+        if name == "total":
+            continue
+        if name in by_id:
+            columns.append((idx, by_id[name]))
+        elif len(by_name.get(name, [])) == 1:
+            columns.append((idx, by_name[name][0]))
+        elif name in by_name:
+            errors.append({"column": name, "error": "ambiguous item name, use the item id"})
+        else:
+            errors.append({"column": name, "error": "unknown item"})
+
+    cells = {}
+    for line_no, row in enumerate(reader, start=2):
+        if not row or not any(c.strip() for c in row):
+            continue
+        sid = row[0].strip()
+        if sid not in seller_ids:
+            errors.append({"line": line_no, "seller_id": sid, "error": "unknown seller for team"})
+            continue
+        for idx, iid in columns:
+            cell = row[idx].strip() if idx < len(row) else ""
+            if cell == "":
+                continue
+            try:
+                cells[(sid, iid)] = _parse_qty(cell)
+            except ValueError:
+                errors.append({"line": line_no, "seller_id": sid, "item_id": iid, "error": "value must be int"})
+    return cells, errors
+
+@bp.get("/search")
+@login_required
+def search():
+    """Typeahead over seller/item/team names (accent/case-insensitive), ranked and paginated."""
+    started = time.perf_counter()
+    q = request.args.get("q", "")
+    kinds = [k for k in (request.args.get("type") or ",".join(KINDS)).split(",") if k in KINDS]
+    team_id = request.args.get("team_id") or None
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 100))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be int"}), 400
+
+    user = current_user() or {}
+    if user.get("role") != "ADMIN":
+        team_id = user.get("team_id")  # manager só enxerga a própria equipe
+    if team_id and not can_access_team(team_id):
+        abort(403)
+
+    def accept(entry):
+        if team_id is None or entry["type"] == "item":
+            return True
+        if entry["type"] == "seller":
+            return entry["team_id"] == team_id
+        return entry["id"] == team_id
+
+    total, results = get_index().search(q, kinds=kinds, accept=accept, limit=limit, offset=offset)
+    return jsonify({
+        "q": q,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+    })
+
 # --- Optional JSON admin APIs (useful for integrations) ---
 @bp.get("/admin/teams")
 @login_required
@@ -142,3 +391,42 @@ def admin_list_sellers():
 def admin_list_items():
     data = load_data()
     return jsonify(data.get("items", []))
+
+@bp.get("/admin/store")
+@login_required
+@role_required("ADMIN")
+def admin_store_status():
+    return jsonify(store_status())
+
+@bp.get("/admin/compression")
+@login_required
+@role_required("ADMIN")
+def admin_compression_report():
+    return jsonify(compression_report())
+
+@bp.post("/admin/batch")
+@login_required
+@role_required("ADMIN")
+def admin_batch():
+    """Apply an ordered list of catalog operations as one transaction (one commit)."""
+    payload = request.get_json(silent=True) or {}
+    operations = payload.get("operations") if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+
+    with store_lock():
+        data = load_data()
+        try:
+            work, summary = apply_batch(data, operations)
+        except CatalogError as e:
+            return jsonify({"error": str(e), "index": e.index}), 400
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            # o cache só é trocado pela cópia de trabalho se o commit der certo
+            save_data(work, f"Catalog batch: {summary['created']} created, {summary['updated']} updated, {summary['deleted']} deleted")
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
+    return jsonify({"ok": True, **summary, "updated_at": work.get("meta", {}).get("updated_at")})
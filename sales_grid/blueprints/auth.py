@@ -1,12 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 
-from ..services.auth import authenticate
+from ..services.auth import authenticate, current_user
 
 bp = Blueprint("auth", __name__)
 
 @bp.get("/login")
 def login():
-    if session.get("user"):
+    if current_user():
         return redirect(url_for("main.home"))
     return render_template("login.html")
 
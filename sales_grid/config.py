@@ -1,5 +1,7 @@
 import os
 
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-me")
 
@@ -11,6 +13,36 @@ class Config:
     GITHUB_BRANCH = os.environ.get("GITHUB_BRANCH", "main")
     GITHUB_PATH = os.environ.get("GITHUB_PATH", "data/sales-grid.json")
 
+    # Warm start: last known good document + sha kept on local disk
+    WARM_START = os.environ.get("WARM_START", "1") == "1"
+    SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", os.path.join(_BASE_DIR, "data", ".sales-grid.snapshot.json"))
+
+    # Resilience: circuit breaker, rate-limit pacing and local outbox for writes accepted while GitHub is down
+    GITHUB_BREAKER_THRESHOLD = int(os.environ.get("GITHUB_BREAKER_THRESHOLD", "3"))
+    GITHUB_BREAKER_COOLDOWN = int(os.environ.get("GITHUB_BREAKER_COOLDOWN", "30"))
+    GITHUB_RATE_RESERVE = int(os.environ.get("GITHUB_RATE_RESERVE", "100"))
+    OUTBOX_PATH = os.environ.get("OUTBOX_PATH", os.path.join(_BASE_DIR, "data", ".sales-grid.outbox.json"))
+
+    # Large documents: above this size (bytes) commits go through the Git Data API instead of Contents
+    GITHUB_INLINE_MAX_BYTES = int(os.environ.get("GITHUB_INLINE_MAX_BYTES", "700000"))
+    GITHUB_COMPRESS = int(os.environ.get("GITHUB_COMPRESS", "0"))  # 1 = store the JSON gzip-compressed
+
+    # In-memory sales as compact array matrices per period/team, 1/2/4-byte cells widened on demand (0 = plain nested dicts)
+    COMPACT_SALES = os.environ.get("COMPACT_SALES", "1") == "1"
+
+    # Multi-tenant: "" (one company), "subdomain" (<slug>.TENANT_BASE_DOMAIN) or "path" (/<slug>/...)
+    TENANT_MODE = os.environ.get("TENANT_MODE", "")
+    TENANTS = os.environ.get("TENANTS", "")  # JSON: {"slug": {"GITHUB_REPO": ..., "GITHUB_TOKEN_ENV": ..., ...}}
+    TENANTS_FILE = os.environ.get("TENANTS_FILE", "")
+    TENANT_BASE_DOMAIN = os.environ.get("TENANT_BASE_DOMAIN", "")
+    TENANT_CACHE_SIZE = int(os.environ.get("TENANT_CACHE_SIZE", "32"))
+    TENANT_IDLE_SECONDS = int(os.environ.get("TENANT_IDLE_SECONDS", "1800"))
+
+    # Response compression (gzip, plus brotli when the package is installed)
+    COMPRESS_ENABLED = os.environ.get("COMPRESS_ENABLED", "1") == "1"
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))
+    COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+
     # Security
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = "Lax"
@@ -0,0 +1,57 @@
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, abort, current_app, redirect, request, url_for
+from werkzeug.security import safe_join
+
+# Assets fingerprinted: /assets/<sha>/<arquivo> com cache imutável de 1 ano
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+_digests = {}  # caminho -> (mtime, tamanho, digest, bytes)
+_digests_lock = threading.Lock()
+
+
+def _asset(filename: str):
+    path = safe_join(current_app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    st = os.stat(path)
+    with _digests_lock:
+        cached = _digests.get(path)
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached
+    with open(path, "rb") as f:
+        content = f.read()
+    entry = (st.st_mtime_ns, st.st_size, hashlib.sha256(content).hexdigest()[:12], content)
+    with _digests_lock:
+        _digests[path] = entry
+    return entry
+
+
+def asset_url(filename: str) -> str:
+    """url_for for static files with a content hash in the path (falls back to /static)."""
+    entry = _asset(filename)
+    if entry is None:
+        return url_for("static", filename=filename)
+    return url_for("asset", digest=entry[2], filename=filename)
+
+
+def _serve_asset(digest: str, filename: str):
+    entry = _asset(filename)
+    if entry is None:
+        abort(404)
+    if entry[2] != digest:
+        # HTML antigo apontando para versão velha: manda para a atual (sem cache longo)
+        return redirect(url_for("asset", digest=entry[2], filename=filename))
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    resp = Response(entry[3], mimetype=mimetype)
+    resp.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+    resp.set_etag(digest)
+    return resp.make_conditional(request)
+
+
+def init_app(app):
+    app.add_url_rule("/assets/<digest>/<path:filename>", endpoint="asset", view_func=_serve_asset)
+    app.jinja_env.globals["asset_url"] = asset_url
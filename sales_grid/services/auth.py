@@ -1,17 +1,20 @@
 from functools import wraps
-from flask import session, redirect, url_for, flash, request, current_app
+from flask import session, redirect, url_for, flash, request, g
 from werkzeug.security import check_password_hash
-from .github_store import load_data
+from .github_store import load_data, current_store
 
 def current_user():
     u = session.get("user")
+    # multi-tenant: uma sessão só vale para o tenant em que o login foi feito
+    if u and u.get("tenant") != g.get("tenant"):
+        return None
     return u
 
 def login_required(view):
     @wraps(view)
     def wrapper(*args, **kwargs):
-        if not session.get("user"):
-            return redirect(url_for("auth.login", next=request.path))
+        if not current_user():
+            return redirect(url_for("auth.login", next=request.script_root + request.path))
         return view(*args, **kwargs)
     return wrapper
 
@@ -19,9 +22,9 @@ def role_required(*roles):
     def deco(view):
         @wraps(view)
         def wrapper(*args, **kwargs):
-            u = session.get("user")
+            u = current_user()
             if not u:
-                return redirect(url_for("auth.login", next=request.path))
+                return redirect(url_for("auth.login", next=request.script_root + request.path))
             if u.get("role") not in roles:
                 flash("Acesso negado.", "danger")
                 return redirect(url_for("main.home"))
@@ -30,7 +33,7 @@ def role_required(*roles):
     return deco
 
 def can_access_team(team_id: str) -> bool:
-    u = session.get("user")
+    u = current_user()
     if not u:
         return False
     if u.get("role") == "ADMIN":
@@ -44,11 +47,12 @@ def authenticate(email: str, password: str):
     if not email or not password:
         return None
 
-    # Admin from env
-    admin_email = (current_app.config.get("ADMIN_EMAIL") or "").strip().lower()
-    admin_pass = current_app.config.get("ADMIN_PASSWORD") or ""
+    # Admin from env (or from the tenant config)
+    settings = current_store().settings
+    admin_email = (settings.get("ADMIN_EMAIL") or "").strip().lower()
+    admin_pass = settings.get("ADMIN_PASSWORD") or ""
     if email == admin_email and password == admin_pass:
-        return {"email": email, "role": "ADMIN", "team_id": None}
+        return {"email": email, "role": "ADMIN", "team_id": None, "tenant": g.get("tenant")}
 
     # Managers from JSON
     data = load_data()
@@ -56,5 +60,5 @@ def authenticate(email: str, password: str):
         if (u.get("email") or "").strip().lower() == email and u.get("role") == "MANAGER":
             ph = u.get("password_hash") or ""
             if ph and check_password_hash(ph, password):
-                return {"email": email, "role": "MANAGER", "team_id": u.get("team_id")}
+                return {"email": email, "role": "MANAGER", "team_id": u.get("team_id"), "tenant": g.get("tenant")}
     return None
@@ -0,0 +1,159 @@
+import copy
+
+ENTITIES = {
+    "team": ("teams", "t", ("name", "manager_name", "manager_photo_url")),
+    "seller": ("sellers", "s", ("name", "team_id", "photo_url")),
+    "item": ("items", "i", ("name", "photo_url", "video_url", "target")),
+}
+
+
+class CatalogError(ValueError):
+    def __init__(self, index: int, message: str):
+        super().__init__(f"operation {index}: {message}")
+        self.index = index
+
+
+def ensure_sales_cells(data, team_id: str, seller_id: str):
+    # For each period, ensure this seller exists with all items (only if team_id exists)
+    items = data.get("items", [])
+    sales = data.setdefault("sales", {})
+    for pid, per in sales.items():
+        per.setdefault(team_id, {})
+        per[team_id].setdefault(seller_id, {it["id"]: 0 for it in items})
+        # also ensure any missing item keys
+        for it in items:
+            per[team_id][seller_id].setdefault(it["id"], 0)
+
+
+def ensure_item_cells(data, item_id: str):
+    sales = data.setdefault("sales", {})
+    for pid, per in sales.items():
+        for tid, team_sales in per.items():
+            for sid, row in team_sales.items():
+                row.setdefault(item_id, 0)
+
+
+def move_seller_sales(data, seller_id: str, old_team: str, new_team: str):
+    sales = data.setdefault("sales", {})
+    for pid, per in sales.items():
+        old = per.get(old_team, {})
+        row = old.pop(seller_id, None)
+        if row is None:
+            continue
+        per.setdefault(new_team, {})
+        per[new_team][seller_id] = row
+
+
+def _clean(field: str, value):
+    if field == "target":
+        return int(value or 18)
+    return (value or "").strip() if isinstance(value, str) or value is None else value
+
+
+def apply_batch(data: dict, operations: list):
+    """Apply an ordered list of catalog operations to a working copy of ``data``.
+
+    Each operation is ``{"op": "create"|"update"|"delete", "entity": "team"|"seller"|"item",
+    "id": ..., <fields>}``. The input document is never touched: the caller commits
+    the returned copy once, or drops it if a ``CatalogError`` is raised. Sales
+    cascades run a single time at the end, driven by what changed.
+    """
+    work = copy.deepcopy(data)
+    index = {entity: {} for entity in ENTITIES}
+    for entity, (key, _, _) in ENTITIES.items():
+        for obj in work.setdefault(key, []):
+            index[entity][obj.get("id")] = obj
+
+    origin_team = {sid: s.get("team_id") for sid, s in index["seller"].items()}
+    initial_items = set(index["item"])
+    purged = {entity: set() for entity in ENTITIES}
+    summary = {"created": 0, "updated": 0, "deleted": 0}
+
+    for n, op in enumerate(operations or []):
+        if not isinstance(op, dict):
+            raise CatalogError(n, "must be an object")
+        action, entity = op.get("op"), op.get("entity")
+        if entity not in ENTITIES:
+            raise CatalogError(n, f"unknown entity {entity!r}")
+        key, prefix, fields = ENTITIES[entity]
+        objs = index[entity]
+        oid = (op.get("id") or "").strip() if isinstance(op.get("id"), str) else op.get("id")
+
+        if action == "create":
+            oid = oid or f"{prefix}{len(objs) + 1}"
+            if oid in objs:
+                raise CatalogError(n, f"ID já existe: {oid}")
+            obj = {"id": oid}
+            for f in fields:
+                obj[f] = _clean(f, op.get(f))
+            objs[oid] = obj
+        elif action in ("update", "delete"):
+            if oid not in objs:
+                raise CatalogError(n, f"{entity} não encontrado: {oid}")
+            if action == "delete":
+                objs.pop(oid)
+                purged[entity].add(oid)
+                if entity == "team":
+                    # also remove sellers of this team
+                    for sid in [sid for sid, s in index["seller"].items() if s.get("team_id") == oid]:
+                        index["seller"].pop(sid)
+                        purged["seller"].add(sid)
+            else:
+                obj = objs[oid]
+                for f in fields:
+                    if f in op:
+                        obj[f] = _clean(f, op.get(f))
+        else:
+            raise CatalogError(n, f"unknown op {action!r}")
+
+        if action != "delete" and entity == "seller" and objs[oid].get("team_id") not in index["team"]:
+            raise CatalogError(n, f"team não encontrado: {objs[oid].get('team_id')}")
+        summary[f"{action}d"] += 1
+
+    for entity, (key, _, _) in ENTITIES.items():
+        work[key] = list(index[entity].values())
+
+    _cascade_sales(work, index, origin_team, initial_items, purged)
+    return work, summary
+
+
+def _cascade_sales(work, index, origin_team, initial_items, purged):
+    sellers = index["seller"]
+    items = [it["id"] for it in work["items"]]
+    added_items = [iid for iid in items if iid not in initial_items or iid in purged["item"]]
+    dropped_items = purged["item"]
+
+    # sellers whose rows must be built from scratch: new ones or recreated ones
+    fresh = [sid for sid in sellers if sid not in origin_team or sid in purged["seller"]]
+    # surviving sellers that now live elsewhere (or in a recreated team): their rows are carried over
+    moved = [
+        (sid, origin_team[sid], s.get("team_id")) for sid, s in sellers.items()
+        if sid not in fresh and (origin_team[sid] != s.get("team_id") or s.get("team_id") in purged["team"])
+    ]
+
+    for pid, per in work.setdefault("sales", {}).items():
+        # pop before purging: the origin (or destination) team may have been deleted in this batch
+        carried = [(sid, new_team, per.get(old_team, {}).pop(sid, None)) for sid, old_team, new_team in moved]
+        for tid in purged["team"]:
+            per.pop(tid, None)
+        for sid in purged["seller"]:
+            team_sales = per.get(origin_team.get(sid))
+            if team_sales is not None:
+                team_sales.pop(sid, None)
+        for sid, new_team, row in carried:
+            if row is not None:
+                per.setdefault(new_team, {})[sid] = row
+
+        if added_items or dropped_items:
+            for tid, team_sales in per.items():
+                for sid, row in team_sales.items():
+                    for iid in dropped_items:
+                        row.pop(iid, None)
+                    for iid in added_items:
+                        row.setdefault(iid, 0)
+
+        # zero-fill only rows that do not exist yet
+        for sid in fresh + [sid for sid, _, _ in moved]:
+            row = per.setdefault(sellers[sid].get("team_id"), {}).setdefault(sid, {})
+            for iid in items:
+                row.setdefault(iid, 0)
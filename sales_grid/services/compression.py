@@ -0,0 +1,97 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, só gzip
+    brotli = None
+
+COMPRESSIBLE = {
+    "application/json",
+    "text/csv",
+    "text/html",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+# Respostas imutáveis (assets com hash) são comprimidas uma vez só: (path, etag, encoding) -> bytes
+_immutable = OrderedDict()
+_IMMUTABLE_MAX = 256
+
+
+def _record(endpoint: str, size_in: int, size_out: int):
+    with _stats_lock:
+        s = _stats.setdefault(endpoint or "-", {"responses": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0})
+        s["responses"] += 1
+        s["compressed"] += size_out < size_in
+        s["bytes_in"] += size_in
+        s["bytes_out"] += size_out
+
+
+def compression_report():
+    """Bytes saved per endpoint since the process started, biggest savings first."""
+    with _stats_lock:
+        rows = [{"endpoint": ep, **s, "bytes_saved": s["bytes_in"] - s["bytes_out"]} for ep, s in _stats.items()]
+    return sorted(rows, key=lambda r: r["bytes_saved"], reverse=True)
+
+
+def _compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=level)
+
+
+def init_app(app):
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+
+    min_size = int(app.config.get("COMPRESS_MIN_SIZE") or 500)
+    level = int(app.config.get("COMPRESS_LEVEL") or 6)
+    offers = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    @app.after_request
+    def _compress_response(response):
+        if (
+            response.mimetype not in COMPRESSIBLE
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        encoding = request.accept_encodings.best_match(offers)
+        if len(body) < min_size or not encoding:
+            _record(request.endpoint, len(body), len(body))
+            return response
+
+        etag, weak = response.get_etag()
+        key = None
+        if etag and response.status_code == 200 and "immutable" in response.headers.get("Cache-Control", ""):
+            key = (request.path, etag, encoding)
+        with _stats_lock:
+            compressed = _immutable.get(key) if key else None
+        if compressed is None:
+            compressed = _compress(body, encoding, level)
+            if key:
+                with _stats_lock:
+                    _immutable[key] = compressed
+                    while len(_immutable) > _IMMUTABLE_MAX:
+                        _immutable.popitem(last=False)
+        _record(request.endpoint, len(body), len(compressed))
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag and not weak:
+            # mesmo validador forte para bytes diferentes (identity x gzip/br) quebraria caches e ranges
+            response.set_etag(etag, weak=True)
+        return response
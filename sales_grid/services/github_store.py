@@ -1,22 +1,67 @@
 import base64
+import gzip
+import io
 import json
+import os
+import re
+import tempfile
 import threading
 import time
+import weakref
 from datetime import datetime, timezone
+from functools import wraps
 
 import requests
-from flask import current_app
-
-_lock = threading.RLock()
-_CACHE = None
-_CACHE_SHA = None
-_CACHE_ETAG = None
+from flask import current_app, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
+
+from .matrix import compact_sales, json_default
+
+# Chaves de configuração que cada Store usa (valores padrão quando ausentes)
+STORE_SETTINGS = {
+    "GITHUB_TOKEN": "",
+    "GITHUB_REPO": "",
+    "GITHUB_BRANCH": "main",
+    "GITHUB_PATH": "data/sales-grid.json",
+    "WARM_START": False,
+    "SNAPSHOT_PATH": "",
+    "OUTBOX_PATH": "",
+    "GITHUB_BREAKER_THRESHOLD": 3,
+    "GITHUB_BREAKER_COOLDOWN": 30,
+    "GITHUB_RATE_RESERVE": 100,
+    "GITHUB_INLINE_MAX_BYTES": 700_000,
+    "GITHUB_COMPRESS": 0,
+    "COMPACT_SALES": True,
+    "ADMIN_EMAIL": "",
+    "ADMIN_PASSWORD": "",
+}
+
+_STORES = weakref.WeakSet()
+_DEFAULT_STORE = None
+
+
+class GitHubUnavailable(RuntimeError):
+    pass
 
 
 def _utcnow_iso():
     return datetime.now(timezone.utc).isoformat()
 
 
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
 def _headers(token: str):
     h = {
         "Accept": "application/vnd.github+json",
@@ -32,51 +77,20 @@ def _contents_url(repo: str, path: str):
     return f"https://api.github.com/repos/{repo}/contents/{path}"
 
 
-def _get_cfg():
-    import os
-    try:
-        cfg = current_app.config
-    except RuntimeError:
-        cfg = None
-
-    token = (cfg.get("GITHUB_TOKEN") if cfg else os.environ.get("GITHUB_TOKEN", "")) or ""
-    repo = (cfg.get("GITHUB_REPO") if cfg else os.environ.get("GITHUB_REPO", "")) or ""
-    branch = (cfg.get("GITHUB_BRANCH") if cfg else os.environ.get("GITHUB_BRANCH", "main")) or "main"
-    gh_path = (cfg.get("GITHUB_PATH") if cfg else os.environ.get("GITHUB_PATH", "data/sales-grid.json")) or "data/sales-grid.json"
-    return token, repo, branch, gh_path
-
-
-def _request(method: str, url: str, *, headers=None, params=None, json_body=None, timeout=8, retries=1):
-    last_exc = None
-    for attempt in range(retries + 1):
-        try:
-            r = requests.request(
-                method,
-                url,
-                headers=headers,
-                params=params,
-                json=json_body,
-                timeout=timeout,
-            )
-            if r.status_code in (502, 503, 504):
-                if attempt < retries:
-                    time.sleep(0.6 * (attempt + 1))
-                    continue
-            return r
-        except requests.RequestException as e:
-            last_exc = e
-            if attempt < retries:
-                time.sleep(0.6 * (attempt + 1))
-                continue
-
-    if last_exc:
-        raise RuntimeError(f"GitHub request failed: {last_exc}") from last_exc
-    raise RuntimeError("GitHub request failed (unknown)")
+def _git_url(repo: str, path: str):
+    return f"https://api.github.com/repos/{repo}/git/{path}"
 
 
 def _decode_content_b64(content_b64: str) -> str:
     cleaned = (content_b64 or "").replace("\n", "")
-    return base64.b64decode(cleaned).decode("utf-8")
+    raw = base64.b64decode(cleaned)
+    if raw[:2] == b"\x1f\x8b":
+        raw = gzip.decompress(raw)
+    return raw.decode("utf-8")
+
+
+def _serialize(data: dict) -> str:
+    return json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True, default=json_default)
 
 
 def seed_data():
@@ -154,119 +168,770 @@ def _ensure_user_password_hashes(data: dict):
             u["password_hash"] = generate_password_hash("manager123")
 
 
-def load_data(force: bool = False):
-    global _CACHE, _CACHE_SHA, _CACHE_ETAG
-
-    with _lock:
-        if _CACHE is not None and not force:
-            return _CACHE
-
-        token, repo, branch, gh_path = _get_cfg()
-
-        if not repo:
-            if _CACHE is None:
-                _CACHE = seed_data()
-                _ensure_user_password_hashes(_CACHE)
-                _ensure_item_targets(_CACHE)
-            return _CACHE
-
-        url = _contents_url(repo, gh_path)
-
+def _seed_cache():
+    data = seed_data()
+    _ensure_user_password_hashes(data)
+    _ensure_item_targets(data)
+    return data
+
+
+class Store:
+    """One GitHub-backed JSON document: its own lock, cache, sha, breaker, snapshot and outbox.
+
+    A single-company deployment has one Store; in multi-tenant mode each tenant
+    gets its own (see services/tenants.py). Settings are captured at creation, so
+    background threads never need an app context.
+    """
+
+    def __init__(self, settings, name: str = "default"):
+        self.name = name
+        self.settings = {k: settings.get(k, default) for k, default in STORE_SETTINGS.items()}
+        self.lock = threading.RLock()  # estado em memória (cache, sha, outbox); nunca fica preso em I/O do GitHub
+        self.edit_lock = threading.RLock()  # ler-modificar-salvar (store_lock) e commits, um de cada vez
+        self.seed_pending = None
+        self.cache = None
+        self.sha = None
+        self.etag = None
+        self.revalidating = False
+        self.degraded = False  # cache é seed de fallback (GitHub nunca respondeu): não pode ser commitado
+        self.degraded_retry_at = 0.0
+        # Circuit breaker + rate limit
+        self.breaker = {"failures": 0, "open_until": 0.0}
+        self.rate = {"remaining": None, "reset": 0.0}
+        self.last_commit = 0.0
+        # Outbox: escritas aceitas enquanto o GitHub está indisponível (ou sob pacing), replay em background
+        self.outbox = None
+        self.outbox_file = None  # arquivo do outbox deste processo, quando gravado
+        self.outbox_checked = False  # já procurou outbox órfão (de um processo que morreu)?
+        self.flusher = None
+        self.last_used = time.time()
+        self.search_index = None  # índice derivado do cache (services/search.py)
+        _STORES.add(self)
+
+    # --- config ---
+    def _cfg(self):
+        s = self.settings
+        return (
+            s["GITHUB_TOKEN"] or "",
+            s["GITHUB_REPO"] or "",
+            s["GITHUB_BRANCH"] or "main",
+            s["GITHUB_PATH"] or "data/sales-grid.json",
+        )
+
+    def _number(self, key: str) -> float:
         try:
-            r = _request("GET", url, headers=_headers(token), params={"ref": branch}, timeout=8, retries=1)
-        except Exception:
-            # GitHub inacessível — usa seed como fallback sem travar o app
-            if _CACHE is None:
-                _CACHE = seed_data()
-                _ensure_user_password_hashes(_CACHE)
-                _ensure_item_targets(_CACHE)
-            return _CACHE
-
-        if r.status_code == 200:
-            payload = r.json()
-            raw = _decode_content_b64(payload.get("content", ""))
-            data = json.loads(raw)
-            _ensure_user_password_hashes(data)
-            _ensure_item_targets(data)
-            _CACHE = data
-            _CACHE_SHA = payload.get("sha")
-            _CACHE_ETAG = r.headers.get("ETag")
-            return _CACHE
-
-        if r.status_code == 404:
-            data = seed_data()
-            _ensure_user_password_hashes(data)
-            _ensure_item_targets(data)
+            value = self.settings.get(key)
+            return float(value if value not in (None, "") else STORE_SETTINGS[key])
+        except (TypeError, ValueError):
+            return float(STORE_SETTINGS[key])
+
+    # --- circuit breaker / rate limit ---
+    def _breaker_wait(self) -> float:
+        return max(0.0, self.breaker["open_until"] - time.time())
+
+    def _breaker_open(self) -> bool:
+        return self._breaker_wait() > 0
+
+    def _record_success(self):
+        self.breaker["failures"] = 0
+        self.breaker["open_until"] = 0.0
+
+    def _record_failure(self):
+        # Em half-open (cooldown expirado, failures ainda acima do limite) uma falha reabre na hora
+        self.breaker["failures"] += 1
+        if self.breaker["failures"] >= self._number("GITHUB_BREAKER_THRESHOLD"):
+            self.breaker["open_until"] = time.time() + self._number("GITHUB_BREAKER_COOLDOWN")
+
+    def _track_rate(self, r):
+        remaining = r.headers.get("X-RateLimit-Remaining")
+        reset = r.headers.get("X-RateLimit-Reset")
+        try:
+            if remaining is not None:
+                self.rate["remaining"] = int(remaining)
+            if reset is not None:
+                self.rate["reset"] = float(reset)
+        except ValueError:
+            pass
+
+    def _rate_limited_until(self, r):
+        # 403/429 de rate limit (primário ou secundário): segura tudo até o reset informado
+        if r.status_code not in (403, 429):
+            return None
+        retry_after = r.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return time.time() + int(retry_after)
+        if r.headers.get("X-RateLimit-Remaining") == "0":
+            return max(self.rate["reset"], time.time() + 1)
+        return None
+
+    def _pacing_delay(self) -> float:
+        """Seconds until the next commit fits the remaining rate-limit budget (0 = commit now)."""
+        remaining, reset, now = self.rate["remaining"], self.rate["reset"], time.time()
+        if remaining is None or remaining >= self._number("GITHUB_RATE_RESERVE") or reset <= now:
+            return 0.0
+        interval = (reset - now) / max(remaining, 1)
+        return max(0.0, self.last_commit + interval - now)
+
+    def _request(self, method: str, url: str, *, headers=None, params=None, json_body=None, timeout=8, retries=1, stream=False):
+        if self._breaker_open():
+            raise GitHubUnavailable(f"GitHub unavailable (circuit open for {int(self._breaker_wait())}s)")
+
+        last_exc = None
+        for attempt in range(retries + 1):
             try:
-                save_data(data, "Seed initial Sales Grid data")
-            except Exception:
-                pass  # Se não conseguir salvar, usa seed em memória mesmo
-            _CACHE = data
-            return _CACHE
-
-        if r.status_code in (401, 403):
-            # Token inválido ou sem permissão — usa seed silenciosamente
-            if _CACHE is None:
-                _CACHE = seed_data()
-                _ensure_user_password_hashes(_CACHE)
-                _ensure_item_targets(_CACHE)
-            return _CACHE
-
-        # Qualquer outro erro — fallback para seed
-        if _CACHE is None:
-            _CACHE = seed_data()
-            _ensure_user_password_hashes(_CACHE)
-        return _CACHE
-
-
-def save_data(data: dict, commit_message: str):
-    global _CACHE, _CACHE_SHA, _CACHE_ETAG
-
-    with _lock:
-        token, repo, branch, gh_path = _get_cfg()
+                r = requests.request(
+                    method,
+                    url,
+                    headers=headers,
+                    params=params,
+                    json=json_body,
+                    timeout=timeout,
+                    stream=stream,
+                )
+                self._track_rate(r)
+                if r.status_code in (502, 503, 504):
+                    if attempt < retries:
+                        time.sleep(0.6 * (attempt + 1))
+                        continue
+                until = self._rate_limited_until(r)
+                if r.status_code >= 500:
+                    self._record_failure()
+                elif until:
+                    self.breaker["open_until"] = max(self.breaker["open_until"], until)
+                else:
+                    self._record_success()
+                return r
+            except requests.RequestException as e:
+                last_exc = e
+                if attempt < retries:
+                    time.sleep(0.6 * (attempt + 1))
+                    continue
 
-        data.setdefault("meta", {})
-        data["meta"]["updated_at"] = _utcnow_iso()
+        self._record_failure()
+        if last_exc:
+            raise GitHubUnavailable(f"GitHub request failed: {last_exc}") from last_exc
+        raise GitHubUnavailable("GitHub request failed (unknown)")
+
+    # --- decode ---
+    def _load_blob_raw(self, sha: str) -> dict:
+        """Fetch a blob as raw bytes (no base64, up to 100 MB) and parse it.
+
+        Download and gunzip are streamed, but json.load still reads the whole
+        text before parsing: this avoids the base64 copy, not the text itself.
+        """
+        token, repo, _, _ = self._cfg()
+        headers = _headers(token)
+        headers["Accept"] = "application/vnd.github.raw"
+        r = self._request("GET", _git_url(repo, f"blobs/{sha}"), headers=headers, timeout=30, retries=1, stream=True)
+        if r.status_code != 200:
+            raise RuntimeError(f"GitHub blob fetch failed: {r.status_code}")
+        r.raw.decode_content = True  # desfaz o Content-Encoding do transporte
+        stream = io.BufferedReader(r.raw, buffer_size=1 << 16)
+        if stream.peek(2)[:2] == b"\x1f\x8b":
+            stream = gzip.GzipFile(fileobj=stream)  # documento armazenado comprimido
+        try:
+            return json.load(io.TextIOWrapper(stream, encoding="utf-8"))
+        finally:
+            r.close()
+
+    def _parse_payload(self, payload: dict) -> dict:
+        if payload.get("content") or payload.get("encoding") != "none":
+            data = json.loads(_decode_content_b64(payload.get("content", "")))
+        else:
+            # Arquivos > 1 MB: a Contents API não traz o conteúdo inline, só o sha do blob
+            data = self._load_blob_raw(payload.get("sha"))
+        _ensure_user_password_hashes(data)
+        _ensure_item_targets(data)
+        return self._prepare(data)
+
+    def _prepare(self, data: dict) -> dict:
+        """Swap the sales dicts for array-backed matrices (services/matrix.py) when enabled."""
+        if self.settings.get("COMPACT_SALES"):
+            compact_sales(data)
+        return data
+
+    # --- local files: snapshot (warm start) and outbox (pending writes) ---
+    def _source(self):
+        _, repo, branch, gh_path = self._cfg()
+        return {"repo": repo, "branch": branch, "path": gh_path}
+
+    def _local_path(self, key: str):
+        # O outbox é por processo (<outbox>.<pid>.json): workers do gunicorn nunca gravam,
+        # apagam ou reenviam as escritas pendentes uns dos outros
+        path = self.settings.get(key)
+        if path and key == "OUTBOX_PATH":
+            root, ext = os.path.splitext(path)
+            return f"{root}.{os.getpid()}{ext}"
+        return path
+
+    def _write_local(self, key: str, record: dict) -> bool:
+        path = self._local_path(key)
+        if not path:
+            return False
+        tmp = None
+        try:
+            folder = os.path.dirname(path) or "."
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, prefix=os.path.basename(path) + ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"source": self._source(), **record}, f, ensure_ascii=False, default=json_default)
+            os.replace(tmp, path)
+        except OSError:
+            if tmp and os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            return False  # arquivo local é só otimização/fallback; nunca derruba um save
+        if key == "OUTBOX_PATH":
+            self.outbox_file = path
+        return True
+
+    def _read_local(self, key: str, path: str = None):
+        path = path or self._local_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("source") != self._source() or not isinstance(record.get("data"), dict):
+            return None
+        return record
+
+    def _remove_local(self, key: str):
+        path = self._local_path(key)
+        if key == "OUTBOX_PATH":
+            self.outbox_file = None
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _claim_outbox(self):
+        """This process's outbox, else adopt one left by a dead process (the atomic rename is the claim)."""
+        self.outbox_checked = True
+        base = self.settings.get("OUTBOX_PATH")
+        if not base:
+            return None
+        mine = self._local_path("OUTBOX_PATH")
+        if os.path.exists(mine):
+            record = self._read_local("OUTBOX_PATH")
+            if record:
+                self.outbox_file = mine
+            return record
+
+        folder = os.path.dirname(base) or "."
+        root, ext = os.path.splitext(os.path.basename(base))
+        pattern = re.compile(re.escape(root) + r"\.(\d+)" + re.escape(ext) + "$")
+        candidates = [base]  # formato antigo, de antes do outbox por processo
+        try:
+            names = os.listdir(folder)
+        except OSError:
+            names = []
+        for name in names:
+            m = pattern.match(name)
+            if m and not _pid_alive(int(m.group(1))):
+                candidates.append(os.path.join(folder, name))
+
+        def _mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0.0
 
-        if not repo:
-            _CACHE = data
-            return
+        for path in sorted(candidates, key=_mtime, reverse=True):
+            if self._read_local("OUTBOX_PATH", path) is None:
+                continue  # outro documento (tenant/repo) ou arquivo inválido
+            try:
+                os.rename(path, mine)
+            except OSError:
+                continue  # outro worker reivindicou primeiro
+            record = self._read_local("OUTBOX_PATH")
+            if record:
+                self.outbox_file = mine
+                return record
+        return None
+
+    def _owns_outbox(self) -> bool:
+        # Depois de um fork, um filho pode ter assumido o arquivo do pai: quem perdeu o arquivo não reenvia
+        return self.outbox_file is None or os.path.exists(self.outbox_file)
+
+    def _write_snapshot(self, data: dict, sha, etag):
+        self._write_local("SNAPSHOT_PATH", {"sha": sha, "etag": etag, "saved_at": _utcnow_iso(), "data": data})
+
+    def _restore_local(self, outbox_only: bool = False):
+        """Adopt the local outbox (pending writes) or snapshot as the cache. Returns True if found."""
+        outbox = self._claim_outbox()
+        local = outbox or (None if outbox_only else self._read_local("SNAPSHOT_PATH"))
+        if not local:
+            return False
+        self.cache = self._prepare(local["data"])
+        self.sha = local.get("sha")
+        self.etag = local.get("etag")
+        if outbox:
+            self.outbox = outbox
+            self._ensure_flusher()  # replay das escritas que ficaram pendentes
+        return True
+
+    # --- load / save ---
+    def _fallback_cache(self):
+        """GitHub failed and nothing is cached: prefer local outbox/snapshot, seed only as last resort."""
+        if self.cache is not None or self._restore_local():
+            return self.cache
+        # Seed em memória só para o app não travar; marcado para nunca ser commitado por cima dos dados reais
+        self.cache = self._prepare(_seed_cache())
+        self.degraded = True
+        return self.cache
+
+    def load(self, force: bool = False):
+        data = self._load(force)
+        if self.seed_pending is not None:
+            with self.lock:
+                seed, self.seed_pending = self.seed_pending, None
+            if seed is not None:
+                try:
+                    self.save(seed, "Seed initial Sales Grid data")
+                except Exception:
+                    pass  # Se não conseguir salvar, usa seed em memória mesmo
+        return data
+
+    def _load(self, force: bool):
+        with self.lock:
+            self.last_used = time.time()
+            if self.cache is not None and not force:
+                if self.degraded and not self._breaker_open() and time.time() >= self.degraded_retry_at:
+                    # tenta recuperar os dados reais sem segurar a request
+                    self.degraded_retry_at = time.time() + self._number("GITHUB_BREAKER_COOLDOWN")
+                    self.revalidate_async()
+                return self.cache
+
+            token, repo, branch, gh_path = self._cfg()
+
+            if not repo:
+                if self.cache is None:
+                    self.cache = self._prepare(_seed_cache())
+                return self.cache
+
+            # Escritas já confirmadas (HTTP 200) que ficaram num outbox órfão são mais novas que o GitHub,
+            # mesmo com WARM_START=0: o primeiro load as assume e o flusher faz o replay
+            if self.cache is None and not self.outbox_checked and self._restore_local(outbox_only=True):
+                return self.cache
+
+            url = _contents_url(repo, gh_path)
+            headers = _headers(token)
+            if self.cache is not None and self.etag:
+                headers["If-None-Match"] = self.etag
 
+            try:
+                r = self._request("GET", url, headers=headers, params={"ref": branch}, timeout=8, retries=1)
+            except Exception:
+                # GitHub inacessível — usa dados locais sem travar o app
+                return self._fallback_cache()
+
+            if r.status_code == 304:
+                return self.cache
+
+            if r.status_code == 200:
+                if self.outbox is not None:
+                    return self.cache  # escritas locais pendentes são mais novas que o GitHub
+                payload = r.json()
+                self.cache = self._parse_payload(payload)
+                self.sha = payload.get("sha")
+                self.etag = r.headers.get("ETag")
+                self.degraded = False
+                self._write_snapshot(self.cache, self.sha, self.etag)
+                return self.cache
+
+            if r.status_code == 404:
+                # o commit do seed sai depois de soltar o lock (ver load)
+                self.cache = self.seed_pending = self._prepare(_seed_cache())
+                self.degraded = False
+                return self.cache
+
+            # 401/403 (token inválido ou sem permissão) ou qualquer outro erro
+            return self._fallback_cache()
+
+    def _put_via_git_data(self, blob: dict, commit_message: str):
+        """Commit a document too large for the Contents API through blobs/trees/commits/refs."""
+        token, repo, branch, gh_path = self._cfg()
+        headers = _headers(token)
+
+        def _check(r, what):
+            if r.status_code >= 500 or self._rate_limited_until(r):
+                raise GitHubUnavailable(f"GitHub {what} failed: {r.status_code}")
+            if r.status_code not in (200, 201):
+                raise RuntimeError(f"GitHub {what} failed: {r.status_code} {r.text}")
+            return r.json()
+
+        blob_sha = _check(self._request("POST", _git_url(repo, "blobs"), headers=headers, json_body=blob, timeout=60, retries=1), "blob upload")["sha"]
+
+        for attempt in range(2):
+            head = _check(self._request("GET", _git_url(repo, f"ref/heads/{branch}"), headers=headers, timeout=8, retries=1), "ref lookup")["object"]["sha"]
+            base_tree = _check(self._request("GET", _git_url(repo, f"commits/{head}"), headers=headers, timeout=8, retries=1), "commit lookup")["tree"]["sha"]
+            tree = _check(self._request("POST", _git_url(repo, "trees"), headers=headers, json_body={
+                "base_tree": base_tree,
+                "tree": [{"path": gh_path, "mode": "100644", "type": "blob", "sha": blob_sha}],
+            }, timeout=15, retries=1), "tree create")["sha"]
+            commit = _check(self._request("POST", _git_url(repo, "commits"), headers=headers, json_body={
+                "message": commit_message, "tree": tree, "parents": [head],
+            }, timeout=15, retries=1), "commit create")["sha"]
+            r = self._request("PATCH", _git_url(repo, f"refs/heads/{branch}"), headers=headers, json_body={"sha": commit, "force": False}, timeout=15, retries=1)
+            if r.status_code == 422 and attempt == 0:
+                continue  # branch andou (não é fast-forward): refaz sobre o novo head
+            _check(r, "ref update")
+            return blob_sha, None
+        raise RuntimeError("GitHub ref update failed")
+
+    def _put_document(self, raw: str, commit_message: str, sha):
+        """Commit the serialized document; returns (sha, etag). Raises GitHubUnavailable when GitHub is unhealthy.
+
+        Small documents go through the Contents API; above GITHUB_INLINE_MAX_BYTES (or
+        the 1 MB Contents API wall) they are uploaded as a Git blob. With
+        GITHUB_COMPRESS the stored file is gzip.
+        """
+        token, repo, branch, gh_path = self._cfg()
         url = _contents_url(repo, gh_path)
 
+        compress = bool(self._number("GITHUB_COMPRESS"))
+        payload_bytes = raw.encode("utf-8")
+        if compress:
+            payload_bytes = gzip.compress(payload_bytes, compresslevel=6)
+        if len(payload_bytes) > self._number("GITHUB_INLINE_MAX_BYTES"):
+            if not compress:
+                blob = {"content": raw, "encoding": "utf-8"}  # sem o inchaço de 33% do base64
+            else:
+                blob = {"content": base64.b64encode(payload_bytes).decode("ascii"), "encoding": "base64"}
+            return self._put_via_git_data(blob, commit_message)
+
         def _fetch_sha():
-            r0 = _request("GET", url, headers=_headers(token), params={"ref": branch}, timeout=8, retries=1)
+            r0 = self._request("GET", url, headers=_headers(token), params={"ref": branch}, timeout=8, retries=1)
             if r0.status_code == 200:
                 return r0.json().get("sha")
             if r0.status_code == 404:
                 return None
+            if r0.status_code >= 500 or self._rate_limited_until(r0):
+                raise GitHubUnavailable(f"GitHub preflight failed: {r0.status_code}")
             raise RuntimeError(f"GitHub preflight failed: {r0.status_code} {r0.text}")
 
-        sha = _CACHE_SHA if _CACHE_SHA else _fetch_sha()
+        sha = sha if sha else _fetch_sha()
 
-        raw = json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True)
-        content_b64 = base64.b64encode(raw.encode("utf-8")).decode("utf-8")
+        content_b64 = base64.b64encode(payload_bytes).decode("utf-8")
 
         body = {"message": commit_message, "content": content_b64, "branch": branch}
         if sha:
             body["sha"] = sha
 
-        r2 = _request("PUT", url, headers=_headers(token), json_body=body, timeout=15, retries=1)
+        r2 = self._request("PUT", url, headers=_headers(token), json_body=body, timeout=15, retries=1)
 
         if r2.status_code == 409:
             sha = _fetch_sha()
             body.pop("sha", None)
             if sha:
                 body["sha"] = sha
-            r2 = _request("PUT", url, headers=_headers(token), json_body=body, timeout=15, retries=1)
+            r2 = self._request("PUT", url, headers=_headers(token), json_body=body, timeout=15, retries=1)
 
+        if r2.status_code >= 500 or self._rate_limited_until(r2):
+            raise GitHubUnavailable(f"GitHub save failed: {r2.status_code}")
         if r2.status_code not in (200, 201):
             raise RuntimeError(f"GitHub save failed: {r2.status_code} {r2.text}")
 
         payload = r2.json()
-        _CACHE_SHA = payload.get("content", {}).get("sha") or payload.get("sha")
-        _CACHE_ETAG = r2.headers.get("ETag")
-        _CACHE = data
+        return payload.get("content", {}).get("sha") or payload.get("sha"), r2.headers.get("ETag")
+
+    def save(self, data: dict, commit_message: str):
+        # edit_lock serializa os commits; o PUT roda fora de self.lock, então leituras
+        # continuam servindo o cache mesmo com o GitHub pendurado
+        with self.edit_lock:
+            with self.lock:
+                self.last_used = time.time()
+                _, repo, _, _ = self._cfg()
+
+                if repo and self.degraded:
+                    raise GitHubUnavailable("GitHub unavailable and real data not loaded yet; change not saved")
+
+                data.setdefault("meta", {})
+                data["meta"]["updated_at"] = _utcnow_iso()
+
+                if not repo:
+                    self.cache = data
+                    return
+
+                # Breaker aberto, orçamento de rate limit apertado ou fila pendente: aceita localmente e commita depois
+                if self.outbox is not None or self._breaker_open() or self._pacing_delay() > 0:
+                    self._enqueue(data, commit_message)
+                    return
+
+                raw, base_sha = _serialize(data), self.sha
+
+            try:
+                sha, etag = self._put_document(raw, commit_message, base_sha)
+            except GitHubUnavailable:
+                with self.lock:
+                    self._enqueue(data, commit_message)
+                return
+
+            with self.lock:
+                self.sha, self.etag = sha, etag
+                self.last_commit = time.time()
+                self.cache = data
+                self._write_snapshot(data, self.sha, self.etag)
+
+    # --- outbox ---
+    def _enqueue(self, data: dict, commit_message: str):
+        if self.outbox is None:
+            self.outbox = {"sha": self.sha, "seq": 0, "messages": []}
+        self.outbox["seq"] += 1
+        self.outbox["messages"] = (self.outbox["messages"] + [commit_message])[-50:]
+        self.outbox["queued_at"] = _utcnow_iso()
+        self.outbox["data"] = data
+        self._write_local("OUTBOX_PATH", self.outbox)
+        self.cache = data
+        self._ensure_flusher()
+
+    def flush_outbox(self):
+        """Commit the pending outbox document (one commit for all queued writes). Returns True if flushed."""
+        with self.lock:
+            entry = self.outbox
+            if entry is not None and not self._owns_outbox():
+                self.outbox = self.outbox_file = None
+                return False
+            if entry is None or not self._cfg()[1]:
+                return False
+            seq, messages = entry["seq"], list(entry["messages"])
+            raw = _serialize(entry["data"])
+            base_sha = self.sha
+
+        if len(messages) == 1:
+            message = messages[0]
+        else:
+            message = f"Replay {len(messages)} queued changes\n\n" + "\n".join(messages)
+        sha, etag = self._put_document(raw, message, base_sha)  # fora do lock: requests seguem servindo o cache
+
+        with self.lock:
+            self.sha, self.etag = sha, etag
+            self.last_commit = time.time()
+            if self.outbox is entry and entry["seq"] == seq:
+                self.outbox = None
+                self._remove_local("OUTBOX_PATH")
+                self._write_snapshot(entry["data"], sha, etag)
+            elif self.outbox is not None:
+                # chegaram escritas durante o commit: continuam na fila, agora sobre o novo sha
+                self.outbox["sha"] = sha
+                self.outbox["messages"] = self.outbox["messages"][len(messages):]
+                self._write_local("OUTBOX_PATH", self.outbox)
+        return True
+
+    def _flush_loop(self):
+        failures = 0
+        while True:
+            with self.lock:
+                if self.outbox is None:
+                    self.flusher = None
+                    return
+                wait = max(self._breaker_wait(), self._pacing_delay(), min(300, 5 * 2 ** failures) if failures else 0.5)
+            time.sleep(wait)
+            try:
+                self.flush_outbox()
+                failures = 0
+            except GitHubUnavailable:
+                pass  # breaker já dita o próximo intervalo
+            except Exception:
+                failures += 1
+
+    def _ensure_flusher(self):
+        if self.flusher is not None and self.flusher.is_alive():
+            return
+        self.flusher = threading.Thread(target=self._flush_loop, name=f"sales-grid-outbox-{self.name}", daemon=True)
+        self.flusher.start()
+
+    def busy(self) -> bool:
+        """True while this store has writes not yet committed to GitHub."""
+        return self.outbox is not None
+
+    def status(self):
+        with self.lock:
+            return {
+                "degraded": self.degraded,
+                "breaker_open": self._breaker_open(),
+                "breaker_failures": self.breaker["failures"],
+                "rate_remaining": self.rate["remaining"],
+                "pacing_delay": round(self._pacing_delay(), 1),
+                "outbox_pending": len(self.outbox["messages"]) if self.outbox else 0,
+                "sha": self.sha,
+            }
+
+    # --- warm start / revalidation ---
+    def revalidate(self):
+        """Refresh the cache from GitHub without holding the lock during the request.
+
+        Uses the cached ETag so an unchanged file costs a 304. Returns True when a
+        newer document replaced the cache.
+        """
+        token, repo, branch, gh_path = self._cfg()
+        if not repo:
+            return False
+
+        with self.lock:
+            if self.outbox is not None:
+                self._ensure_flusher()  # escritas locais pendentes são mais novas que o GitHub: só garante o replay
+                return False
+            base_sha = self.sha
+            headers = _headers(token)
+            if self.cache is not None and self.etag and not self.degraded:
+                headers["If-None-Match"] = self.etag
+
+        try:
+            r = self._request("GET", _contents_url(repo, gh_path), headers=headers, params={"ref": branch}, timeout=8, retries=1)
+        except Exception:
+            return False
+        if r.status_code != 200:
+            return False
+
+        payload = r.json()
+        data = self._parse_payload(payload)
+
+        with self.lock:
+            if self.sha != base_sha or self.outbox is not None:
+                return False  # um save (ou load) chegou primeiro; o cache já é mais novo
+            self.cache = data
+            self.sha = payload.get("sha")
+            self.etag = r.headers.get("ETag")
+            self.degraded = False
+            self._write_snapshot(self.cache, self.sha, self.etag)
+            return True
+
+    def revalidate_async(self):
+        with self.lock:
+            if self.revalidating:
+                return
+            self.revalidating = True
+
+        def _run():
+            try:
+                self.revalidate()
+            except Exception:
+                pass
+            finally:
+                self.revalidating = False
+
+        threading.Thread(target=_run, name=f"sales-grid-revalidate-{self.name}", daemon=True).start()
+
+    def warm_start(self):
+        """Load the local outbox/snapshot (if any) and revalidate it against GitHub in background."""
+        if not self.settings.get("WARM_START") or not self._cfg()[1]:
+            return
+        with self.lock:
+            if self.cache is None:
+                self._restore_local()
+        self.revalidate_async()
+
+    def _reset_after_fork(self):
+        # Um lock herdado do processo pai pode estar "preso" a uma thread que não existe no filho
+        self.lock = threading.RLock()
+        self.edit_lock = threading.RLock()
+        self.revalidating = False
+        self.flusher = None
+        if self.outbox is not None:
+            # Só um worker herda as escritas pendentes do pai: o que conseguir renomear o arquivo dele
+            inherited, self.outbox_file = self.outbox_file, None
+            try:
+                if not inherited:
+                    raise OSError("outbox only in memory")  # fica com o pai
+                os.rename(inherited, self._local_path("OUTBOX_PATH"))
+                self.outbox_file = self._local_path("OUTBOX_PATH")
+            except OSError:
+                self.outbox = None
+
+
+def _reset_after_fork():
+    for store in list(_STORES):
+        store._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def settings_from(mapping) -> dict:
+    return {k: mapping.get(k, default) for k, default in STORE_SETTINGS.items()}
+
+
+class _StoreJSONProvider(DefaultJSONProvider):
+    """jsonify() that also understands the compact sales matrices."""
+
+    @staticmethod
+    def default(o):
+        try:
+            return json_default(o)
+        except TypeError:
+            return DefaultJSONProvider.default(o)
+
+
+def init_app(app):
+    """Create the app's default store (single-company mode) and warm-start it."""
+    global _DEFAULT_STORE
+
+    app.json = _StoreJSONProvider(app)
+    store = _DEFAULT_STORE = Store(settings_from(app.config))
+    app.extensions["sales_grid_store"] = store
+    if not app.config.get("TENANT_MODE"):
+        store.warm_start()
+    return store
+
+
+def current_store() -> Store:
+    """Store for the current request's tenant, else the app's default store."""
+    global _DEFAULT_STORE
+
+    if has_request_context():
+        store = g.get("tenant_store")
+        if store is not None:
+            return store
+    try:
+        store = current_app.extensions.get("sales_grid_store")
+    except RuntimeError:
+        store = None
+    if store is not None:
+        return store
+    if _DEFAULT_STORE is None:
+        # Fora de um app (scripts): configuração direto das variáveis de ambiente
+        from ..config import Config
+        _DEFAULT_STORE = Store({k: getattr(Config, k) for k in STORE_SETTINGS if hasattr(Config, k)})
+    return _DEFAULT_STORE
+
+
+def load_data(force: bool = False):
+    return current_store().load(force)
+
+
+def save_data(data: dict, commit_message: str):
+    return current_store().save(data, commit_message)
+
+
+def flush_outbox():
+    return current_store().flush_outbox()
+
+
+def store_status():
+    return current_store().status()
+
+
+def revalidate():
+    return current_store().revalidate()
+
+
+def revalidate_async(app):
+    """Revalidate every store this process holds for ``app`` (used after a gunicorn fork)."""
+    stores = [app.extensions.get("sales_grid_store")]
+    registry = app.extensions.get("sales_grid_tenants")
+    if registry is not None:
+        stores = registry.stores()
+    for store in stores:
+        if store is not None:
+            store.revalidate_async()
 
 
 def get_cache():
@@ -274,10 +939,24 @@ def get_cache():
 
 
 def set_cache(data: dict):
-    global _CACHE
-    with _lock:
-        _CACHE = data
+    store = current_store()
+    with store.lock:
+        store.cache = data
 
 
 def store_lock():
-    return _lock
+    """Lock for a read-modify-save cycle on the current document (not held by plain reads)."""
+    return current_store().edit_lock
+
+
+def edit_locked(view):
+    """Run a whole handler (load, modify, save) under store_lock().
+
+    Writers that change the cached document in place must hold it, or a save
+    of an object loaded before a batch swap would commit that stale object.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with store_lock():
+            return view(*args, **kwargs)
+    return wrapper
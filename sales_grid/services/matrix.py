@@ -0,0 +1,305 @@
+from array import array
+from collections.abc import MutableMapping
+
+# Células guardam valor+1 (0 = célula ausente), então o maior valor aceito é 2**32 - 2
+MAX_CELL_VALUE = 2 ** 32 - 2
+# Largura da célula cresce sob demanda: 1 byte até 254, 2 bytes até 65534, depois 4 bytes
+_WIDTHS = (("B", 2 ** 8 - 1), ("H", 2 ** 16 - 1), ("I", 2 ** 32 - 1))
+_LIMITS = dict(_WIDTHS)
+
+
+def _zeros(n: int, typecode: str = "B"):
+    return array(typecode, bytes(n * array(typecode).itemsize))
+
+
+def _check(value):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= MAX_CELL_VALUE:
+        raise ValueError(f"sales values must be integers between 0 and {MAX_CELL_VALUE}")
+    return value
+
+
+class _Index:
+    """Append-only key -> position map shared by several matrices."""
+
+    __slots__ = ("pos", "keys")
+
+    def __init__(self):
+        self.pos = {}
+        self.keys = []
+
+    def add(self, key):
+        i = self.pos.get(key)
+        if i is None:
+            i = self.pos[key] = len(self.keys)
+            self.keys.append(key)
+        return i
+
+
+class RowView(MutableMapping):
+    """item_id -> int view over one seller row of a TeamMatrix."""
+
+    __slots__ = ("_m", "_r")
+
+    def __init__(self, matrix, row: int):
+        self._m = matrix
+        self._r = row
+
+    def _col(self, item_id):
+        c = self._m._items.pos.get(item_id)
+        return None if c is None or c >= self._m._stride else c
+
+    def __getitem__(self, item_id):
+        c = self._col(item_id)
+        v = self._m._cells[self._r * self._m._stride + c] if c is not None else 0
+        if not v:
+            raise KeyError(item_id)
+        return v - 1
+
+    def __setitem__(self, item_id, value):
+        _check(value)
+        c = self._m._items.add(item_id)
+        self._m._grow(self._r + 1, c + 1)
+        self._m._widen(value + 1)
+        self._m._cells[self._r * self._m._stride + c] = value + 1
+
+    def __delitem__(self, item_id):
+        c = self._col(item_id)
+        base = self._r * self._m._stride
+        if c is None or not self._m._cells[base + c]:
+            raise KeyError(item_id)
+        self._m._cells[base + c] = 0
+
+    def __iter__(self):
+        m, keys = self._m, self._m._items.keys
+        base = self._r * m._stride
+        return iter([keys[c] for c in range(m._stride) if m._cells[base + c]])
+
+    def __len__(self):
+        base = self._r * self._m._stride
+        return self._m._stride - self._m._cells[base:base + self._m._stride].count(0)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TeamMatrix(MutableMapping):
+    """seller_id -> row for one period/team, stored as one contiguous unsigned array.
+
+    Rows come from the team's seller index and columns from the global item
+    index, both shared across periods. Cells start at one byte and widen to
+    'H'/'I' the first time a larger value is written.
+    """
+
+    def __init__(self, sellers: _Index, items: _Index):
+        self._sellers = sellers
+        self._items = items
+        self._stride = 0
+        self._cells = array("B")
+        self._present = bytearray()  # linha existe no documento (mesmo vazia)
+        self._count = 0
+
+    def _widen(self, stored: int):
+        if stored <= _LIMITS[self._cells.typecode]:
+            return
+        typecode = next(tc for tc, limit in _WIDTHS if stored <= limit)
+        self._cells = array(typecode, self._cells)
+
+    def _grow(self, rows: int, cols: int):
+        nrows = len(self._present)
+        if cols > self._stride:
+            stride = max(cols, len(self._items.keys))
+            cells = _zeros(max(rows, nrows) * stride, self._cells.typecode)
+            for r in range(nrows):
+                old = r * self._stride
+                cells[r * stride:r * stride + self._stride] = self._cells[old:old + self._stride]
+            self._cells, self._stride = cells, stride
+            if rows > nrows:
+                self._present.extend(bytes(rows - nrows))
+        elif rows > nrows:
+            rows = max(rows, len(self._sellers.keys))
+            self._cells.extend(_zeros((rows - nrows) * self._stride, self._cells.typecode))
+            self._present.extend(bytes(rows - nrows))
+
+    def _row(self, seller_id):
+        r = self._sellers.pos.get(seller_id)
+        if r is None or r >= len(self._present) or not self._present[r]:
+            return None
+        return r
+
+    def __getitem__(self, seller_id):
+        r = self._row(seller_id)
+        if r is None:
+            raise KeyError(seller_id)
+        return RowView(self, r)
+
+    def __setitem__(self, seller_id, row):
+        values = dict(row)  # copia antes: ``row`` pode ser uma view desta mesma matriz
+        for v in values.values():
+            _check(v)
+        r = self._sellers.add(seller_id)
+        self._grow(r + 1, self._stride)
+        base = r * self._stride
+        self._cells[base:base + self._stride] = _zeros(self._stride, self._cells.typecode)
+        if not self._present[r]:
+            self._present[r] = 1
+            self._count += 1
+        view = RowView(self, r)
+        for item_id, v in values.items():
+            view[item_id] = v
+
+    def __delitem__(self, seller_id):
+        r = self._row(seller_id)
+        if r is None:
+            raise KeyError(seller_id)
+        base = r * self._stride
+        self._cells[base:base + self._stride] = _zeros(self._stride, self._cells.typecode)
+        self._present[r] = 0
+        self._count -= 1
+
+    def __iter__(self):
+        keys = self._sellers.keys
+        return iter([keys[r] for r, flag in enumerate(self._present) if flag])
+
+    def __len__(self):
+        return self._count
+
+    def pop(self, seller_id, *default):
+        # devolve um dict solto: a view deixaria de valer depois do delete
+        r = self._row(seller_id)
+        if r is None:
+            if default:
+                return default[0]
+            raise KeyError(seller_id)
+        row = dict(RowView(self, r))
+        del self[seller_id]
+        return row
+
+    def setdefault(self, seller_id, default=None):
+        if self._row(seller_id) is None:
+            self[seller_id] = default or {}
+        return self[seller_id]
+
+    def to_dict(self):
+        return {sid: dict(row) for sid, row in self.items()}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class PeriodSales(MutableMapping):
+    """team_id -> TeamMatrix for one period."""
+
+    def __init__(self, root):
+        self._root = root
+        self._teams = {}
+
+    def __getitem__(self, team_id):
+        return self._teams[team_id]
+
+    def __setitem__(self, team_id, value):
+        matrix = TeamMatrix(self._root._team_sellers(team_id), self._root._items)
+        for seller_id, row in dict(value).items():
+            if not hasattr(row, "items"):
+                raise ValueError(f"sales row for {seller_id} must be an object")
+            matrix[seller_id] = row
+        self._teams[team_id] = matrix
+
+    def __delitem__(self, team_id):
+        del self._teams[team_id]
+
+    def __iter__(self):
+        return iter(list(self._teams))
+
+    def __len__(self):
+        return len(self._teams)
+
+    def setdefault(self, team_id, default=None):
+        if team_id not in self._teams:
+            self[team_id] = default or {}
+        return self._teams[team_id]
+
+    def to_dict(self):
+        return {tid: m.to_dict() for tid, m in self._teams.items()}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class CompactSales(MutableMapping):
+    """Drop-in replacement for ``data["sales"]`` (period -> team -> seller -> item -> int).
+
+    Each period/team is one array of 1-4 byte cells; seller and item positions
+    come from indexes shared by every period, so a cell costs a byte or two
+    instead of a dict entry plus an int object.
+    """
+
+    def __init__(self):
+        self._items = _Index()
+        self._sellers = {}
+        self._periods = {}
+
+    def _team_sellers(self, team_id):
+        index = self._sellers.get(team_id)
+        if index is None:
+            index = self._sellers[team_id] = _Index()
+        return index
+
+    @classmethod
+    def from_dict(cls, sales: dict):
+        """Lossless conversion; raises ValueError if anything would not round-trip."""
+        compact = cls()
+        for period_id, per in (sales or {}).items():
+            if not isinstance(per, dict) or any(not isinstance(t, dict) for t in per.values()):
+                raise ValueError(f"sales for {period_id} must be nested objects")
+            compact[period_id] = per
+        return compact
+
+    def __getitem__(self, period_id):
+        return self._periods[period_id]
+
+    def __setitem__(self, period_id, value):
+        period = PeriodSales(self)
+        for team_id, team_sales in dict(value).items():
+            period[team_id] = team_sales
+        self._periods[period_id] = period
+
+    def __delitem__(self, period_id):
+        del self._periods[period_id]
+
+    def __iter__(self):
+        return iter(list(self._periods))
+
+    def __len__(self):
+        return len(self._periods)
+
+    def setdefault(self, period_id, default=None):
+        if period_id not in self._periods:
+            self[period_id] = default or {}
+        return self._periods[period_id]
+
+    def to_dict(self):
+        return {pid: p.to_dict() for pid, p in self._periods.items()}
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+def compact_sales(data: dict) -> bool:
+    """Swap ``data["sales"]`` for a CompactSales in place; keeps the dicts if conversion is not lossless."""
+    sales = data.get("sales")
+    if isinstance(sales, CompactSales) or not isinstance(sales, dict):
+        return isinstance(sales, CompactSales)
+    try:
+        data["sales"] = CompactSales.from_dict(sales)
+    except ValueError:
+        return False
+    return True
+
+
+def json_default(obj):
+    """``default=`` hook for json.dumps: plain dicts for the compact sales types."""
+    if isinstance(obj, (CompactSales, PeriodSales, TeamMatrix)):
+        return obj.to_dict()
+    if isinstance(obj, RowView):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,208 @@
+import math
+import threading
+import unicodedata
+from collections import defaultdict
+
+from .github_store import current_store
+
+KINDS = ("seller", "item", "team")
+_COLLECTIONS = {"seller": "sellers", "item": "items", "team": "teams"}
+_MAX_PREFIX = 12
+_MIN_SIMILARITY = 0.3  # Jaccard mínimo entre trigramas de um token da busca e um token do nome
+_MAX_FUZZY_CANDIDATES = 2000
+
+
+def fold(text) -> str:
+    """Accent/case folding: "Lívia" -> "livia", "JOÃO  " -> "joao"."""
+    decomposed = unicodedata.normalize("NFKD", str(text or ""))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared or 1)
+
+
+class SearchIndex:
+    """In-memory index over seller/item/team names: token prefixes + trigrams for fuzzy matches.
+
+    Buckets are only touched under ``self.lock``; entries are never mutated in
+    place (an upsert replaces them), so search scores outside the lock.
+    """
+
+    def __init__(self, source=None):
+        self.source = source  # documento de onde o índice foi construído (identidade)
+        self.lock = threading.RLock()
+        self.docs = {}
+        self.prefixes = defaultdict(set)
+        self.grams = defaultdict(set)
+
+    @classmethod
+    def from_data(cls, data: dict):
+        index = cls(data)
+        for kind in KINDS:
+            for obj in data.get(_COLLECTIONS[kind], []):
+                index.upsert(kind, obj)
+        return index
+
+    def upsert(self, kind: str, obj: dict):
+        with self.lock:
+            self._upsert(kind, obj)
+
+    def _upsert(self, kind: str, obj: dict):
+        key = (kind, obj.get("id"))
+        self._remove(*key)
+        name = obj.get("name") or ""
+        folded = fold(name)
+        tokens = folded.split() or [""]
+        token_grams = [_trigrams(tok) for tok in tokens]
+        entry = {
+            "type": kind,
+            "id": obj.get("id"),
+            "name": name,
+            "folded": folded,
+            "tokens": tokens,
+            "token_grams": token_grams,  # trigramas por token: erro de digitação em nome composto
+            "grams": set().union(*token_grams),
+            "team_id": obj.get("team_id") if kind == "seller" else None,
+            "photo_url": obj.get("photo_url") or "",
+        }
+        self.docs[key] = entry
+        for tok in tokens:
+            for n in range(1, min(len(tok), _MAX_PREFIX) + 1):
+                self.prefixes[tok[:n]].add(key)
+        for gram in entry["grams"]:
+            self.grams[gram].add(key)
+
+    def remove(self, kind: str, oid):
+        with self.lock:
+            self._remove(kind, oid)
+
+    def _remove(self, kind: str, oid):
+        entry = self.docs.pop((kind, oid), None)
+        if entry is None:
+            return
+        key = (kind, oid)
+        for tok in entry["tokens"]:
+            for n in range(1, min(len(tok), _MAX_PREFIX) + 1):
+                bucket = self.prefixes.get(tok[:n])
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del self.prefixes[tok[:n]]
+        for gram in entry["grams"]:
+            bucket = self.grams.get(gram)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.grams[gram]
+
+    def _score(self, entry, q: str, q_tokens, q_token_grams):
+        if entry["folded"] == q:
+            return 1.0
+        if entry["folded"].startswith(q):
+            return 0.9
+        if all(any(t.startswith(qt) for t in entry["tokens"]) for qt in q_tokens):
+            return 0.8
+        # cada token da busca casa (por prefixo ou trigramas) com o melhor token do nome
+        sims = []
+        for qt, q_grams in zip(q_tokens, q_token_grams):
+            if any(t.startswith(qt) for t in entry["tokens"]):
+                sims.append(1.0)
+                continue
+            best = max((_jaccard(q_grams, grams) for grams in entry["token_grams"]), default=0.0)
+            if best < _MIN_SIMILARITY:
+                return 0.0
+            sims.append(best)
+        return 0.6 * sum(sims) / len(sims)
+
+    def _fuzzy_candidates(self, q_grams: set):
+        # Similaridade >= _MIN_SIMILARITY exige `need` trigramas em comum, então todo token
+        # elegível aparece em algum dos (n - need + 1) buckets mais raros: só esses são unidos
+        need = max(1, math.ceil(_MIN_SIMILARITY * len(q_grams)))
+        buckets = sorted((self.grams.get(g, set()) for g in q_grams), key=len)
+        found = set()
+        for bucket in buckets[:len(q_grams) - need + 1]:
+            found |= bucket
+            if len(found) >= _MAX_FUZZY_CANDIDATES:
+                break
+        return found
+
+    def search(self, q: str, kinds=KINDS, accept=None, limit: int = 20, offset: int = 0):
+        """Return (total, page) of ranked matches; an empty query lists everything by name."""
+        q = fold(q)
+        kinds = set(kinds)
+        if not q:
+            with self.lock:
+                entries = list(self.docs.values())
+            ranked = sorted(
+                (e for e in entries if e["type"] in kinds and (accept is None or accept(e))),
+                key=lambda e: (e["folded"], e["id"] or ""),
+            )
+            return len(ranked), [dict(_public(e), score=0.0) for e in ranked[offset:offset + limit]]
+
+        q_tokens = q.split()
+        q_token_grams = [_trigrams(qt) for qt in q_tokens]
+        with self.lock:
+            # candidatos: todo token da busca casa por prefixo ou por trigramas (interseção entre tokens)
+            candidates = None
+            for qt, q_grams in zip(q_tokens, q_token_grams):
+                hits = {k for k in self.prefixes.get(qt[:_MAX_PREFIX], ()) if any(t.startswith(qt) for t in self.docs[k]["tokens"])}
+                hits |= self._fuzzy_candidates(q_grams)
+                candidates = hits if candidates is None else candidates & hits
+                if not candidates:
+                    break
+            entries = [self.docs[key] for key in candidates or ()]
+
+        ranked = []
+        for entry in entries:
+            if entry["type"] not in kinds or (accept is not None and not accept(entry)):
+                continue
+            score = self._score(entry, q, q_tokens, q_token_grams)
+            if score > 0:
+                ranked.append((score, entry))
+        ranked.sort(key=lambda se: (-se[0], se[1]["folded"], se[1]["id"] or ""))
+        return len(ranked), [dict(_public(e), score=round(s, 3)) for s, e in ranked[offset:offset + limit]]
+
+
+def _public(entry):
+    return {k: entry[k] for k in ("type", "id", "name", "team_id", "photo_url")}
+
+
+def get_index():
+    """Index for the current store's document, rebuilt when the cached document is replaced."""
+    store = current_store()
+    data = store.load()
+    with store.lock:
+        index = store.search_index
+        if index is None or index.source is not data:
+            index = store.search_index = SearchIndex.from_data(data)
+        return index
+
+
+def index_upsert(kind: str, obj: dict):
+    store = current_store()
+    with store.lock:
+        index = store.search_index
+        if index is not None and index.source is store.cache:
+            index.upsert(kind, obj)
+
+
+def index_remove(kind: str, oid):
+    store = current_store()
+    with store.lock:
+        index = store.search_index
+        if index is not None and index.source is store.cache:
+            index.remove(kind, oid)
+
+
+def invalidate_index():
+    store = current_store()
+    with store.lock:
+        store.search_index = None
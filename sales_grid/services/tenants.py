@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import abort, g, request
+
+from .github_store import Store, settings_from
+
+
+def _load_tenants(config):
+    """Tenant map from TENANTS (JSON string) or TENANTS_FILE: {"slug": {"GITHUB_REPO": ..., ...}}."""
+    raw = config.get("TENANTS") or ""
+    path = config.get("TENANTS_FILE") or ""
+    if not raw and path:
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+    tenants = json.loads(raw) if raw else {}
+    if not isinstance(tenants, dict):
+        raise ValueError("TENANTS must be a JSON object keyed by tenant slug")
+    return {str(slug).lower(): (conf or {}) for slug, conf in tenants.items()}
+
+
+def _tenant_path(path: str, slug: str):
+    # data/.sales-grid.snapshot.json -> data/.sales-grid.snapshot.<slug>.json
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{slug}{ext}"
+
+
+def _tenant_credentials(slug: str, conf: dict):
+    # Credenciais de admin nunca são herdadas: com a senha global, quem soubesse o email
+    # do admin de outro tenant entraria nele como admin
+    email = (conf.get("ADMIN_EMAIL") or "").strip()
+    password = conf.get("ADMIN_PASSWORD") or ""
+    if conf.get("ADMIN_PASSWORD_ENV"):
+        password = os.environ.get(conf["ADMIN_PASSWORD_ENV"], "")
+    if not email or not password:
+        raise ValueError(f"tenant {slug!r} needs its own ADMIN_EMAIL and ADMIN_PASSWORD (or ADMIN_PASSWORD_ENV)")
+    return email, password
+
+
+class TenantRegistry:
+    """Bounded LRU of loaded tenant stores; idle tenants are evicted (never with pending writes)."""
+
+    def __init__(self, config):
+        self.base = settings_from(config)
+        self.tenants = _load_tenants(config)
+        targets = {}
+        for slug, conf in self.tenants.items():
+            _tenant_credentials(slug, conf)  # falha no boot, não no primeiro login
+            settings = self._settings(slug)
+            if not settings["GITHUB_REPO"]:
+                continue
+            # Dois tenants no mesmo documento veriam os dados um do outro e se sobrescreveriam
+            target = (settings["GITHUB_REPO"], settings["GITHUB_BRANCH"] or "main", settings["GITHUB_PATH"])
+            if target in targets:
+                raise ValueError(f"tenants {targets[target]!r} and {slug!r} point to the same GitHub document {target}")
+            targets[target] = slug
+        self.max_size = int(config.get("TENANT_CACHE_SIZE") or 32)
+        self.idle_seconds = float(config.get("TENANT_IDLE_SECONDS") or 1800)
+        self.sweep_interval = min(60.0, self.idle_seconds)
+        self._swept_at = time.time()
+        self._stores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _settings(self, slug: str):
+        conf = self.tenants[slug]
+        settings = dict(self.base)
+        settings["SNAPSHOT_PATH"] = _tenant_path(self.base["SNAPSHOT_PATH"], slug)
+        settings["OUTBOX_PATH"] = _tenant_path(self.base["OUTBOX_PATH"], slug)
+        settings.update({k: v for k, v in conf.items() if k in settings})
+        settings["ADMIN_EMAIL"], settings["ADMIN_PASSWORD"] = _tenant_credentials(slug, conf)
+        if conf.get("GITHUB_TOKEN_ENV"):
+            settings["GITHUB_TOKEN"] = os.environ.get(conf["GITHUB_TOKEN_ENV"], "")
+        return settings
+
+    def get(self, slug: str):
+        with self._lock:
+            store = self._stores.get(slug)
+            if store is not None:
+                self._stores.move_to_end(slug)
+                store.last_used = time.time()
+                # também varre os ociosos em hits (com throttle), senão só um tenant novo descarregaria os outros
+                if store.last_used - self._swept_at >= self.sweep_interval:
+                    self._evict(keep=slug)
+                return store
+            if slug not in self.tenants:
+                return None
+            store = Store(self._settings(slug), name=slug)
+            self._stores[slug] = store
+            self._evict(keep=slug)
+        store.warm_start()
+        return store
+
+    def _evict(self, keep: str):
+        now = self._swept_at = time.time()
+        for slug, store in list(self._stores.items()):  # do menos para o mais recentemente usado
+            if slug == keep or store.busy():
+                continue
+            if len(self._stores) > self.max_size or now - store.last_used > self.idle_seconds:
+                del self._stores[slug]
+
+    def stores(self):
+        with self._lock:
+            return list(self._stores.values())
+
+
+class TenantPathMiddleware:
+    """Path-prefix mode: /<slug>/home -> SCRIPT_NAME=/<slug>, PATH_INFO=/home (url_for keeps the prefix)."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        head, _, rest = path.lstrip("/").partition("/")
+        if head:
+            environ["sales_grid.tenant"] = head.lower()
+            environ["SCRIPT_NAME"] = environ.get("SCRIPT_NAME", "") + "/" + head
+            environ["PATH_INFO"] = "/" + rest
+        return self.wsgi_app(environ, start_response)
+
+
+def _resolve_slug(config):
+    mode = config.get("TENANT_MODE")
+    if mode == "path":
+        return request.environ.get("sales_grid.tenant")
+    if mode == "subdomain":
+        host = request.host.split(":")[0].lower()
+        base = (config.get("TENANT_BASE_DOMAIN") or "").lower()
+        if base:
+            return host[: -len(base) - 1] if host.endswith("." + base) else None
+        parts = host.split(".")
+        return parts[0] if len(parts) > 2 else None
+    return None
+
+
+def current_tenant():
+    return g.get("tenant")
+
+
+def init_app(app):
+    mode = app.config.get("TENANT_MODE")
+    if not mode:
+        return None
+    if mode not in ("subdomain", "path"):
+        raise ValueError("TENANT_MODE must be 'subdomain' or 'path'")
+
+    registry = TenantRegistry(app.config)
+    app.extensions["sales_grid_tenants"] = registry
+    if mode == "path":
+        app.wsgi_app = TenantPathMiddleware(app.wsgi_app)
+
+    @app.before_request
+    def _bind_tenant():
+        if request.endpoint in ("static", "asset"):
+            return None
+        slug = _resolve_slug(app.config)
+        store = registry.get(slug) if slug else None
+        if store is None:
+            abort(404)
+        g.tenant = slug
+        g.tenant_store = store
+
+    return registry
@@ -4,6 +4,7 @@
 
   const teamId = table.dataset.teamId;
   const periodId = table.dataset.periodId;
+  const cellUrl = table.dataset.cellUrl || '/api/cell';
 
   const statusEl = document.getElementById('saveStatus');
   const metaEl = document.getElementById('saveMeta');
@@ -116,7 +117,7 @@ function recalcTotals() {
     pending = null;
 
     try {
-      const res = await fetch('/api/cell', {
+      const res = await fetch(cellUrl, {
         method: 'PATCH',
         headers: {'Content-Type': 'application/json'},
         body: JSON.stringify(payload)